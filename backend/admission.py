@@ -0,0 +1,198 @@
+import asyncio
+from collections import deque
+
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from constants import (
+    ADMISSION_GLOBAL_LIMIT,
+    ADMISSION_USER_LIMIT,
+    ADMISSION_QUEUE_SIZE,
+    ADMISSION_QUEUE_TIMEOUT,
+    ADMISSION_LOW_PRIORITY_LOAD,
+    ADMISSION_LOW_PRIORITY_PATHS,
+    ADMISSION_REQUEST_DEADLINE,
+    ADMISSION_RETRY_AFTER,
+)
+
+class AdmissionControlMiddleware:
+    """
+    Ограничивает количество одновременно выполняемых запросов: на весь процесс
+    и на одного пользователя (cookie user_id; запросы без cookie ограничиваются только глобально).
+
+    - пользователь, превысивший свой лимит (вместе с ожидающими запросами), сразу получает 503;
+    - при заполненном глобальном лимите запрос ждет в FIFO-очереди ограниченного размера,
+      при переполнении очереди или по таймауту ожидания — 503;
+    - низкоприоритетные маршруты отклоняются уже при частичной загрузке;
+    - запрос отменяется, если клиент отключился или истек ADMISSION_REQUEST_DEADLINE (504).
+    """
+    def __init__(
+        self,
+        app,
+        global_limit=ADMISSION_GLOBAL_LIMIT,
+        user_limit=ADMISSION_USER_LIMIT,
+        queue_size=ADMISSION_QUEUE_SIZE,
+        queue_timeout=ADMISSION_QUEUE_TIMEOUT,
+        low_priority_load=ADMISSION_LOW_PRIORITY_LOAD,
+        low_priority_paths=ADMISSION_LOW_PRIORITY_PATHS,
+        deadline=ADMISSION_REQUEST_DEADLINE,
+        retry_after=ADMISSION_RETRY_AFTER,
+    ):
+        self.app = app
+        self.global_limit = global_limit
+        self.user_limit = user_limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.low_priority_limit = global_limit * low_priority_load
+        self.low_priority_paths = tuple(low_priority_paths)
+        self.deadline = deadline
+        self.retry_after = retry_after
+
+        self.active = 0
+        self.by_user = {}       # Выполняющиеся и ожидающие запросы пользователя
+        self.waiters = deque()  # (future, пользователь) в порядке поступления
+
+    async def __call__(self, scope, receive, send):
+        # Preflight-запросы CORS не ограничиваем
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        user = self.client_key(scope)
+        if scope["path"].startswith(self.low_priority_paths) and self.active >= self.low_priority_limit:
+            await self.reject(scope, receive, send)
+            return
+        if not await self.acquire(user):
+            await self.reject(scope, receive, send)
+            return
+        try:
+            await self.run(scope, receive, send)
+        finally:
+            self.release(user)
+
+    @staticmethod
+    def client_key(scope):
+        """
+        Идентификатор пользователя из cookie user_id. Без cookie — None: за nginx все
+        такие запросы приходят с одного адреса, поэтому к ним применяется только глобальный лимит.
+        """
+        user_id = Request(scope).cookies.get("user_id")
+        return f"user:{user_id}" if user_id else None
+
+    def add_user(self, user, delta):
+        if user is None:
+            return
+        count = self.by_user.get(user, 0) + delta
+        if count:
+            self.by_user[user] = count
+        else:
+            del self.by_user[user]
+
+    async def acquire(self, user):
+        if user is not None and self.by_user.get(user, 0) >= self.user_limit:
+            return False
+        # Свободное место занимаем сразу, только если никто не ждет в очереди
+        if not self.waiters and self.active < self.global_limit:
+            self.active += 1
+            self.add_user(user, 1)
+            return True
+        if len(self.waiters) >= self.queue_size:
+            return False
+
+        future = asyncio.get_running_loop().create_future()
+        entry = (future, user)
+        self.waiters.append(entry)
+        self.add_user(user, 1)
+        try:
+            await asyncio.wait_for(future, self.queue_timeout)
+        except asyncio.TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            # Место могло быть передано в момент отмены — возвращаем его
+            if future.done() and not future.cancelled():
+                self.release(user)
+            else:
+                self.forget(entry)
+            raise
+
+        if future.done() and not future.cancelled():
+            return True
+        self.forget(entry)
+        return False
+
+    def forget(self, entry):
+        if entry in self.waiters:
+            self.waiters.remove(entry)
+        self.add_user(entry[1], -1)
+
+    def release(self, user):
+        self.active -= 1
+        self.add_user(user, -1)
+        # Освободившиеся места передаем ожидающим строго по очереди
+        while self.waiters and self.active < self.global_limit:
+            future, _ = self.waiters.popleft()
+            if future.done():
+                continue
+            self.active += 1
+            future.set_result(True)
+
+    async def reject(self, scope, receive, send):
+        response = JSONResponse(
+            status_code=503,
+            content={"detail": "Сервис перегружен, повторите запрос позже"},
+            headers={"Retry-After": str(self.retry_after)}
+        )
+        await response(scope, receive, send)
+
+    async def run(self, scope, receive, send):
+        """
+        Выполняет запрос, отменяя его при отключении клиента или по истечении deadline.
+        """
+        messages = asyncio.Queue()
+        disconnected = asyncio.Event()
+        response_started = False
+
+        async def listen():
+            # Читаем входящие сообщения сами, чтобы заметить http.disconnect
+            while True:
+                message = await receive()
+                messages.put_nowait(message)
+                if message["type"] == "http.disconnect":
+                    disconnected.set()
+                    return
+
+        async def app_receive():
+            if disconnected.is_set() and messages.empty():
+                return {"type": "http.disconnect"}
+            return await messages.get()
+
+        async def app_send(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        app_task = asyncio.ensure_future(self.app(scope, app_receive, app_send))
+        listen_task = asyncio.ensure_future(listen())
+        disconnect_task = asyncio.ensure_future(disconnected.wait())
+        try:
+            done, _ = await asyncio.wait(
+                {app_task, disconnect_task},
+                timeout=self.deadline,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            if app_task in done:
+                app_task.result()
+                return
+            app_task.cancel()
+            try:
+                await app_task
+            except asyncio.CancelledError:
+                pass
+            if not disconnected.is_set() and not response_started:
+                await JSONResponse(
+                    status_code=504,
+                    content={"detail": "Превышено время обработки запроса"}
+                )(scope, app_receive, send)
+        finally:
+            for task in (app_task, listen_task, disconnect_task):
+                task.cancel()
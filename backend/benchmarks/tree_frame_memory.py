@@ -0,0 +1,76 @@
+"""
+Память на одну запись кэша: список словарей (старый transform_data) против TreeFrame.
+
+Запуск из каталога backend:
+    python benchmarks/tree_frame_memory.py
+"""
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tree_frame import TreeFrame
+
+def make_upstream(nodes, periods):
+    """
+    Синтетический ответ GetIndexTreeData / GetIndexPeriods: значения — строки, как у taldau.
+    """
+    date_data = {
+        "dateList": [str(122000 + i) for i in range(periods)],
+        "periodNameList": [f"{2000 + i} год" for i in range(periods)],
+    }
+    regions = []
+    for node in range(nodes):
+        region = {"id": 1000 + node, "text": f"Регион {node}", "leaf": True}
+        for date in date_data["dateList"]:
+            if random.random() < 0.9:
+                region[f"y{date}"] = f"{random.uniform(0, 1e6):.1f}"
+        regions.append(region)
+    return regions, date_data
+
+def records(regions_data, date_data):
+    # Формат transform_data до TreeFrame
+    result = []
+    for region in regions_data:
+        region_dict = {"id": region["id"], "text": region["text"], "leaf": region["leaf"]}
+        for i, date in enumerate(date_data["dateList"]):
+            year_value = region.get(f"y{date}")
+            if year_value:
+                region_dict[date_data["periodNameList"][i]] = year_value
+        result.append(region_dict)
+    return result
+
+def measure(build):
+    tracemalloc.start()
+    value = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return value, size
+
+def main():
+    random.seed(0)
+    print(f"{'узлов x периодов':>18} {'list-of-dicts':>14} {'TreeFrame':>12} {'экономия':>9} {'json dicts':>11} {'json frame':>11}")
+    for nodes, periods in ((20, 25), (200, 25), (200, 100), (2000, 25)):
+        # Разбираем JSON внутри замера, чтобы строки значений учитывались так же, как в кэше
+        payload = json.dumps(make_upstream(nodes, periods), ensure_ascii=False)
+        data, dicts_size = measure(lambda: records(*json.loads(payload)))
+        frame, frame_size = measure(lambda: TreeFrame.from_upstream(*json.loads(payload)))
+
+        started = time.perf_counter()
+        json.dumps(data, ensure_ascii=False).encode("utf-8")
+        dicts_json = time.perf_counter() - started
+        started = time.perf_counter()
+        frame.to_json()
+        frame_json = time.perf_counter() - started
+
+        print(
+            f"{nodes:>8} x {periods:<7} {dicts_size / 1024:>11.1f} KiB {frame_size / 1024:>8.1f} KiB "
+            f"{dicts_size / frame_size:>8.1f}x {dicts_json * 1000:>8.2f} ms {frame_json * 1000:>8.2f} ms"
+        )
+
+if __name__ == "__main__":
+    main()
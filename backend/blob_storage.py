@@ -0,0 +1,106 @@
+import hashlib
+import json
+import zlib
+
+from sqlalchemy import create_engine, text, func, Column, Integer, String, LargeBinary, DateTime
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import sessionmaker
+from constants import USER, PASSWORD, HOST, PORT, DB, BLOB_COMPRESSION_LEVEL, BLOB_GC_GRACE_PERIOD
+
+# Конфигурация подключения к PostgreSQL
+DATABASE_URL = f"postgresql://{USER}:{PASSWORD}@{HOST}:{PORT}/{DB}"
+
+engine = create_engine(DATABASE_URL)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+Base = declarative_base()
+
+# Модель для хранения payload-ов графиков (selected_data / primary_data).
+# Ключ — sha256 от канонического JSON, поэтому одинаковые данные разных
+# пользователей хранятся один раз.
+class UserBlob(Base):
+    __tablename__ = "user_blobs"
+    hash = Column(String(64), primary_key=True)
+    data = Column(LargeBinary, nullable=False)   # JSON, сжатый zlib
+    size = Column(Integer, nullable=False)       # Размер несжатого JSON в байтах
+    used_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())  # Последнее сохранение
+
+# Создаем таблицы, если их еще нет
+Base.metadata.create_all(bind=engine)
+
+def upgrade_user_data_schema():
+    """
+    Добавляет в user_data ссылки на user_blobs, а в user_blobs — used_at (create_all не меняет существующие таблицы).
+    Вызывается один раз при старте приложения (main.py) и из migrate_user_blobs.py.
+    Перенос уже сохраненных данных выполняет migrate_user_blobs.py
+    """
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE user_blobs ADD COLUMN IF NOT EXISTS used_at TIMESTAMPTZ NOT NULL DEFAULT now()"))
+        conn.execute(text("ALTER TABLE user_data ADD COLUMN IF NOT EXISTS selected_data_ref VARCHAR(64)"))
+        conn.execute(text("ALTER TABLE user_data ADD COLUMN IF NOT EXISTS primary_data_ref VARCHAR(64)"))
+        conn.execute(text("ALTER TABLE user_data ALTER COLUMN selected_data DROP NOT NULL"))
+        conn.execute(text("ALTER TABLE user_data ALTER COLUMN primary_data DROP NOT NULL"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_user_data_user_id ON user_data (user_id)"))
+        # Для поиска ссылок на blob при удалении неиспользуемых (delete_unused_blobs)
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_user_data_selected_data_ref ON user_data (selected_data_ref)"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_user_data_primary_data_ref ON user_data (primary_data_ref)"))
+
+def canonical_json(payload: str) -> str:
+    """
+    Приводит JSON к компактному виду без лишних пробелов.
+    Порядок ключей сохраняется: от него зависит порядок периодов на графиках.
+    Если строка не является JSON, она возвращается без изменений.
+    """
+    try:
+        return json.dumps(json.loads(payload), ensure_ascii=False, separators=(",", ":"))
+    except ValueError:
+        return payload
+
+def put_blob(db, payload: str) -> str:
+    """
+    Сохраняет payload в user_blobs (если такого еще нет) и возвращает его hash.
+    У существующего blob-а обновляется used_at: строка блокируется до коммита, а
+    delete_unused_blobs не трогает blob-ы, сохраненные позже BLOB_GC_GRACE_PERIOD назад.
+    Коммит выполняет вызывающий код.
+    """
+    raw = canonical_json(payload).encode("utf-8")
+    blob_hash = hashlib.sha256(raw).hexdigest()
+    db.execute(
+        insert(UserBlob.__table__)
+        .values(hash=blob_hash, data=zlib.compress(raw, BLOB_COMPRESSION_LEVEL), size=len(raw))
+        .on_conflict_do_update(index_elements=["hash"], set_={"used_at": func.now()})
+    )
+    return blob_hash
+
+def get_blobs(db, hashes) -> dict:
+    """
+    Возвращает {hash: распакованный JSON} для переданного набора hash-ей одним запросом.
+    """
+    hashes = {h for h in hashes if h}
+    if not hashes:
+        return {}
+    rows = db.query(UserBlob.hash, UserBlob.data).filter(UserBlob.hash.in_(hashes)).all()
+    return {row.hash: zlib.decompress(row.data).decode("utf-8") for row in rows}
+
+def delete_unused_blobs(db, hashes=None) -> int:
+    """
+    Удаляет blob-ы, на которые не ссылается ни одна строка user_data (только среди hashes, если переданы).
+    Blob-ы, сохраненные за последние BLOB_GC_GRACE_PERIOD секунд, пропускаются: ссылка на них
+    может быть еще не закоммичена. Коммит выполняет вызывающий код. Возвращает число удаленных строк.
+    """
+    params = {"grace": BLOB_GC_GRACE_PERIOD}
+    condition = ""
+    if hashes is not None:
+        params["hashes"] = [h for h in set(hashes) if h]
+        if not params["hashes"]:
+            return 0
+        condition = "AND b.hash = ANY(:hashes) "
+    return db.execute(text(
+        "DELETE FROM user_blobs b "
+        "WHERE b.used_at < now() - make_interval(secs => :grace) "
+        + condition +
+        # Отдельный NOT EXISTS на каждую колонку: так Postgres использует индексы
+        # или hash anti-join, а с OR проверял бы каждую строку user_data
+        "AND NOT EXISTS (SELECT 1 FROM user_data d WHERE d.selected_data_ref = b.hash) "
+        "AND NOT EXISTS (SELECT 1 FROM user_data d WHERE d.primary_data_ref = b.hash)"
+    ), params).rowcount
@@ -0,0 +1,114 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+import httpx
+from fastapi import HTTPException
+from constants import BASE_URL, RETRIES, CACHE_TTL, CACHE_MAX_ENTRIES
+
+class TTLCache:
+    """
+    Простой in-memory кэш с временем жизни записей и ограничением по количеству.
+    При переполнении удаляются записи, к которым дольше всего не обращались.
+    """
+    def __init__(self, ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+
+    def get(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key, value):
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
+
+# Кэш ответов taldau и вычисления, выполняющиеся в данный момент
+upstream_cache = TTLCache()
+_inflight = {}
+
+def make_key(method, params):
+    return (method, tuple(sorted((k, str(v)) for k, v in params.items())))
+
+async def fetch_upstream(method, params):
+    """
+    Выполняет запрос к API с передачей параметров и обработкой ошибок.
+    """
+    url = f"{BASE_URL}/{method}"
+
+    for attempt in range(RETRIES):
+        try:
+            async with httpx.AsyncClient() as client:
+                response = await client.get(url, params=params)
+                response.raise_for_status()
+                return response.json()
+        except httpx.HTTPStatusError as exc:
+            if attempt < RETRIES - 1:
+                await asyncio.sleep(2)
+                continue
+            raise HTTPException(
+                status_code=exc.response.status_code,
+                detail=f"Ошибка запроса: {exc.response.text}"
+            )
+        except httpx.RequestError as exc:
+            if attempt < RETRIES - 1:
+                await asyncio.sleep(2)
+                continue
+            raise HTTPException(
+                status_code=500,
+                detail=f"Ошибка соединения: {exc}"
+            )
+        except ValueError as exc:
+            # Ответ пришел, но это не JSON (например, HTML-страница ошибки)
+            raise HTTPException(
+                status_code=502,
+                detail=f"Некорректный ответ API: {exc}"
+            )
+    raise HTTPException(
+        status_code=500,
+        detail="Превышено количество попыток запроса"
+    )
+
+async def get_or_create(cache, key, factory):
+    """
+    Возвращает значение из cache или вычисляет его через factory() (корутина).
+    Одновременные вызовы с одинаковым ключом ждут одно общее вычисление.
+    Возвращаемые данные общие для всех вызовов — изменять их нельзя.
+    """
+    value = cache.get(key)
+    if value is not None:
+        return value
+
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(factory())
+        _inflight[key] = task
+
+        def on_done(done):
+            _inflight.pop(key, None)
+            if not done.cancelled() and done.exception() is None:
+                cache.set(key, done.result())
+
+        task.add_done_callback(on_done)
+
+    # shield: отмена одного клиента не должна отменять вычисление для остальных
+    return await asyncio.shield(task)
+
+async def fetch_cached(method, params):
+    """
+    То же, что fetch_upstream, но через кэш upstream_cache.
+    """
+    return await get_or_create(upstream_cache, make_key(method, params), lambda: fetch_upstream(method, params))
@@ -0,0 +1,171 @@
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
+from typing import List, Optional
+from constants import COMPARE_MAX_INDICATORS
+from new_get_index_tree_data import load_frame
+import asyncio
+
+router = APIRouter()
+
+# Параметры одного показателя — те же, что у new_get_index_tree_data
+class IndicatorSpec(BaseModel):
+    label: Optional[str] = None
+    p_measure_id: int = 1
+    p_index_id: int
+    p_period_id: int
+    p_terms: str
+    p_term_id: int
+    p_dicIds: str
+    idx: int
+    p_parent_id: str = ''
+
+class CompareRequest(BaseModel):
+    indicators: List[IndicatorSpec]
+    align: str = "outer"                       # outer — объединение периодов/узлов, inner — пересечение
+    normalize: Optional[str] = None            # None, "per_capita" или "index"
+    denominator: Optional[IndicatorSpec] = None  # Для per_capita, например численность населения
+    scale: float = 1                           # Множитель для per_capita (например, 1000 — на 1000 человек)
+    base_period: Optional[str] = None          # Для index, по умолчанию первый период оси
+
+def to_series(frame):
+    """
+    Переводит TreeFrame в {id узла: (узел, {название периода: float})}.
+    """
+    width = len(frame.periods)
+    series = {}
+    for row, node in enumerate(frame.nodes):
+        values = {}
+        for col, period in enumerate(frame.periods):
+            value = frame.values[row * width + col]
+            if value == value:
+                values[period] = value
+        series[str(node.id)] = (node, values)
+    return series
+
+def build_axis(keys_per_series, align):
+    """
+    Общая ось: ключи в порядке первого появления, объединение или пересечение.
+    """
+    axis = []
+    seen = set()
+    for keys in keys_per_series:
+        for key in keys:
+            if key not in seen:
+                seen.add(key)
+                axis.append(key)
+    if align == "inner":
+        common = set.intersection(*(set(keys) for keys in keys_per_series))
+        axis = [key for key in axis if key in common]
+    return axis
+
+def sort_periods(names, date_ids):
+    """
+    Упорядочивает периоды по идентификатору даты taldau, если он числовой.
+    """
+    def key(item):
+        position, name = item
+        date_id = str(date_ids.get(name, ""))
+        return (0, int(date_id), position) if date_id.isdigit() else (1, 0, position)
+    return [name for _, name in sorted(enumerate(names), key=key)]
+
+def normalize_values(values, request, denominator, base_index):
+    if request.normalize == "per_capita":
+        return [
+            [
+                v * request.scale / d if v is not None and d else None
+                for v, d in zip(row, denominator_row)
+            ]
+            for row, denominator_row in zip(values, denominator)
+        ]
+    if request.normalize == "index":
+        result = []
+        for row in values:
+            base = row[base_index]
+            result.append([v / base * 100 if v is not None and base else None for v in row])
+        return result
+    return values
+
+@router.post(
+    "/compare_indicators",
+    tags=["Battle"],
+    summary="Сравнение нескольких показателей на общей оси периодов",
+    description="Сравнение нескольких показателей на общей оси периодов"
+)
+async def compare_indicators(request: CompareRequest):
+    """
+    Загружает показатели параллельно (через кэш GetIndexTreeData), выравнивает их
+    по названию периода и id узла и возвращает матрицу values[показатель][узел][период].
+    """
+    if not request.indicators:
+        raise HTTPException(status_code=400, detail="Не передано ни одного показателя")
+    if len(request.indicators) > COMPARE_MAX_INDICATORS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Можно сравнить не более {COMPARE_MAX_INDICATORS} показателей"
+        )
+    if request.align not in ("outer", "inner"):
+        raise HTTPException(status_code=400, detail="align должен быть outer или inner")
+    if request.normalize not in (None, "per_capita", "index"):
+        raise HTTPException(status_code=400, detail="normalize должен быть per_capita или index")
+    if request.normalize == "per_capita" and request.denominator is None:
+        raise HTTPException(status_code=400, detail="Для per_capita нужен denominator")
+
+    specs = list(request.indicators)
+    if request.normalize == "per_capita":
+        specs.append(request.denominator)
+
+    frames = await asyncio.gather(
+        *(load_frame(spec.dict(exclude={"label"})) for spec in specs)
+    )
+    all_series = [to_series(frame) for frame in frames]
+    indicator_series = all_series[:len(request.indicators)]
+    indicator_frames = frames[:len(request.indicators)]
+
+    date_ids = {}
+    for frame in frames:
+        for name, date_id in zip(frame.periods, frame.date_ids):
+            date_ids.setdefault(name, date_id)
+
+    periods = sort_periods(
+        build_axis([frame.periods for frame in indicator_frames], request.align),
+        date_ids
+    )
+    node_ids = build_axis([list(series) for series in indicator_series], request.align)
+
+    nodes = {}
+    for series in all_series:
+        for node_id, (node, _) in series.items():
+            nodes.setdefault(node_id, node)
+
+    def matrix(series):
+        return [
+            [series[node_id][1].get(period) if node_id in series else None for period in periods]
+            for node_id in node_ids
+        ]
+
+    denominator = matrix(all_series[-1]) if request.normalize == "per_capita" else None
+    base_index = 0
+    if request.normalize == "index":
+        if not periods:
+            raise HTTPException(status_code=400, detail="Нет общих периодов для расчета индекса")
+        base_period = request.base_period or periods[0]
+        if base_period not in periods:
+            raise HTTPException(status_code=400, detail=f"Базовый период {base_period} не найден")
+        base_index = periods.index(base_period)
+
+    return {
+        "periods": periods,
+        "nodes": {
+            "id": [nodes[node_id].id for node_id in node_ids],
+            "text": [nodes[node_id].text for node_id in node_ids],
+            "leaf": [nodes[node_id].leaf for node_id in node_ids],
+        },
+        "series": [
+            {
+                "label": spec.label or str(spec.p_index_id),
+                "p_index_id": spec.p_index_id,
+                "values": normalize_values(matrix(series), request, denominator, base_index),
+            }
+            for spec, series in zip(request.indicators, indicator_series)
+        ],
+    }
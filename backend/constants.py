@@ -1,3 +1,5 @@
+import os
+
 #API
 BASE_URL = "https://taldau.stat.gov.kz/ru/Api"
 
@@ -10,4 +12,35 @@ DB = "taldau"
 
 #cache
 CACHE_TTL = 3600
-RETRIES = 3
\ No newline at end of file
+CACHE_MAX_ENTRIES = 2048
+SEGMENT_DICTIONARY_TTL = 86400   # Справочники разрезностей практически не меняются
+RETRIES = 3
+
+#indicators search
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+
+#admission control
+ADMISSION_GLOBAL_LIMIT = 64          # Одновременно выполняемых запросов на процесс
+ADMISSION_USER_LIMIT = 8             # Одновременно выполняемых запросов на пользователя
+ADMISSION_QUEUE_SIZE = 128           # Запросов, ожидающих свободного места
+ADMISSION_QUEUE_TIMEOUT = 5          # Секунд ожидания в очереди
+ADMISSION_LOW_PRIORITY_LOAD = 0.75   # Доля занятых мест, после которой низкоприоритетные запросы отклоняются
+ADMISSION_LOW_PRIORITY_PATHS = ("/compare_indicators", "/get_indicators")
+ADMISSION_REQUEST_DEADLINE = 60      # Секунд на обработку запроса
+ADMISSION_RETRY_AFTER = 5
+
+#profiling
+PROFILING_TOKEN = os.environ.get("PROFILING_TOKEN", "")   # Пустой токен — профилирование выключено
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "/tmp/profiles")
+SLOW_REQUEST_THRESHOLD = 2.0      # Секунд; запросы дольше сохраняются на диск
+PROFILE_MAX_FILES = 200           # Сохраненных профилей; более старые удаляются
+PROFILE_SAMPLE_INTERVAL = 0.01    # Секунд между снимками стека
+LOOP_LAG_THRESHOLD = 0.1          # Секунд блокировки event loop, после которых пишется предупреждение
+
+#compare
+COMPARE_MAX_INDICATORS = 10
+
+#blobs
+BLOB_COMPRESSION_LEVEL = 6
+BLOB_GC_GRACE_PERIOD = 3600   # Секунд после последнего сохранения, в течение которых blob не удаляется
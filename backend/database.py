@@ -22,6 +22,8 @@ class UserData(Base):
     p_term_id = Column(Integer, nullable=False)
     p_dicIds = Column(String, nullable=False)   # Храним как строку
     idx = Column(Integer, nullable=False)
+    selected_data_ref = Column(String(64), nullable=True)  # hash из user_blobs
+    primary_data_ref = Column(String(64), nullable=True)   # hash из user_blobs
 
 # Создаем таблицы, если они ещё не существуют
 Base.metadata.create_all(bind=engine)
\ No newline at end of file
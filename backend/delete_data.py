@@ -1,6 +1,7 @@
 from fastapi import APIRouter, HTTPException, status, Depends, Cookie
 from sqlalchemy.orm import Session
 from database import SessionLocal, engine, Base, UserData  # Ваши настройки подключения к БД
+from blob_storage import delete_unused_blobs
 
 router = APIRouter()
 
@@ -48,8 +49,11 @@ def delete_item(
             detail="Нет прав для удаления данного элемента."
         )
 
-    # Удаляем элемент и сохраняем изменения
+    # Удаляем элемент, а вместе с ним и blob-ы, которые больше никому не нужны
+    refs = [item.selected_data_ref, item.primary_data_ref]
     db.delete(item)
+    db.flush()
+    delete_unused_blobs(db, refs)
     db.commit()
 
     return {"message": "Элемент успешно удалён."}
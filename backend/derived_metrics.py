@@ -0,0 +1,178 @@
+import re
+import numpy as np
+from fastapi import HTTPException
+
+# yoy   — изменение к тому же периоду предыдущего года (год к году), %
+# share — доля узла в итоге (узел share_of или сумма по всем узлам уровня), %
+# cagr  — среднегодовой темп роста между первым и последним известным значением, %
+# rank  — место узла в периоде по убыванию значения (1 — наибольшее)
+METRICS = ("yoy", "share", "cagr", "rank")
+
+def parse_metrics(value):
+    """
+    "yoy,share" -> ("yoy", "share"). Неизвестные метрики -> 400.
+    """
+    if not value:
+        return ()
+    names = tuple(dict.fromkeys(name.strip() for name in value.split(",") if name.strip()))
+    unknown = [name for name in names if name not in METRICS]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Неизвестные метрики: {', '.join(unknown)}. Доступны: {', '.join(METRICS)}"
+        )
+    return names
+
+def chronological_order(frame):
+    """
+    Индексы столбцов в хронологическом порядке (по идентификатору даты taldau).
+    """
+    if all(str(date_id).isdigit() for date_id in frame.date_ids):
+        return np.argsort([int(date_id) for date_id in frame.date_ids], kind="stable")
+    return np.arange(len(frame.periods))
+
+YEAR = re.compile(r"(?<!\d)(?:19|20)\d\d(?!\d)")
+
+def period_calendar(periods):
+    """
+    Разбирает названия периодов (в хронологическом порядке) на год и период внутри года:
+    "2020 год" -> (2020, "год"), "I квартал 2020 (кв.)" -> (2020, "I квартал (кв.)").
+    Возвращает (годы, периоды внутри года) или None, если хотя бы в одном названии нет года.
+    """
+    years = []
+    labels = []
+    for name in periods:
+        found = YEAR.findall(name)
+        if len(found) != 1:
+            return None
+        years.append(int(found[0]))
+        labels.append(" ".join(YEAR.sub(" ", name).split()))
+    return years, labels
+
+def require_calendar(frame, order, name):
+    calendar = period_calendar([frame.periods[col] for col in order])
+    if calendar is None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Метрика {name} недоступна: не удалось определить год по названиям периодов"
+        )
+    return calendar
+
+def previous_year_columns(years, labels):
+    """
+    Для каждого столбца — индекс столбца с тем же периодом предыдущего года или -1.
+    Лаг получается 1 для годовых, 4 для квартальных и 12 для месячных данных, пропуски учитываются.
+    """
+    columns = {(year, label): col for col, (year, label) in enumerate(zip(years, labels))}
+    return np.array([columns.get((year - 1, label), -1) for year, label in zip(years, labels)], dtype=np.intp)
+
+def period_positions(years, labels):
+    """
+    Положение каждого периода на оси времени в годах: год + доля года.
+    Порядок периодов внутри года берется из самого полного года ряда.
+    """
+    if not years:
+        return np.empty(0)
+    by_year = {}
+    for year, label in zip(years, labels):
+        by_year.setdefault(year, []).append(label)
+    reference = max(by_year.values(), key=len)
+    per_year = len(reference)
+    index = {label: position for position, label in enumerate(reference)}
+    return np.array([
+        year + index.get(label, by_year[year].index(label)) / per_year
+        for year, label in zip(years, labels)
+    ])
+
+def yoy(values, previous):
+    result = np.full(values.shape, np.nan)
+    has_previous = previous >= 0
+    base = values[:, previous[has_previous]]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        result[:, has_previous] = np.where(base != 0, (values[:, has_previous] / base - 1) * 100, np.nan)
+    return result
+
+def share(values, base):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(base != 0, values / base * 100, np.nan)
+
+def cagr(values, positions):
+    result = np.full(values.shape[0], np.nan)
+    known = ~np.isnan(values)
+    has_values = known.any(axis=1)
+    if not has_values.any():
+        return result
+
+    width = values.shape[1]
+    first = known.argmax(axis=1)
+    last = width - 1 - known[:, ::-1].argmax(axis=1)
+    rows = np.arange(values.shape[0])
+    start = values[rows, first]
+    end = values[rows, last]
+    years = positions[last] - positions[first]
+
+    valid = has_values & (years > 0) & (start > 0) & (end > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        result[valid] = ((end[valid] / start[valid]) ** (1 / years[valid]) - 1) * 100
+    return result
+
+def rank(values):
+    known = ~np.isnan(values)
+    order = np.argsort(np.where(known, -values, np.inf), axis=0, kind="stable")
+    ranks = np.empty(values.shape)
+    positions = np.broadcast_to(np.arange(1, values.shape[0] + 1, dtype=float)[:, None], values.shape)
+    np.put_along_axis(ranks, order, positions, axis=0)
+    ranks[~known] = np.nan
+    return ranks
+
+def compute_metrics(frame, names, share_of=None):
+    """
+    Считает метрики по всем узлам и периодам frame. Результат запоминается в frame.metrics,
+    поэтому живет в кэше вместе с самим TreeFrame.
+    Возвращает {метрика: массив узлы x периоды}; для cagr — массив по узлам.
+    """
+    values = np.frombuffer(frame.values, dtype=np.float64).reshape(len(frame.nodes), len(frame.periods))
+    order = chronological_order(frame)
+    restore = np.argsort(order)
+
+    result = {}
+    for name in names:
+        key = (name, share_of) if name == "share" else name
+        if key not in frame.metrics:
+            metric = compute_metric(frame, values[:, order], order, name, share_of)
+            # Возвращаем столбцы в исходный порядок периодов
+            frame.metrics[key] = metric if metric.ndim == 1 else metric[:, restore]
+        result[name] = frame.metrics[key]
+    return result
+
+def compute_metric(frame, values, order, name, share_of):
+    if name == "yoy":
+        return yoy(values, previous_year_columns(*require_calendar(frame, order, name)))
+    if name == "share":
+        if share_of is None:
+            # Сумма по всем узлам уровня (ответ содержит одних соседей, leaf означает лишь
+            # отсутствие детей); другая база задается через share_of.
+            # Если в периоде нет ни одного значения — NaN
+            base = np.where(np.isnan(values).all(axis=0), np.nan, np.nansum(values, axis=0))
+        else:
+            rows = [row for row, node in enumerate(frame.nodes) if str(node.id) == share_of]
+            if not rows:
+                raise HTTPException(status_code=400, detail=f"Узел {share_of} не найден")
+            base = values[rows[0]]
+        return share(values, base)
+    if name == "cagr":
+        return cagr(values, period_positions(*require_calendar(frame, order, name)))
+    return rank(values)
+
+def select_metrics(metrics, rows, cols):
+    """
+    Оставляет значения метрик только для выбранных строк и столбцов; NaN -> None, округление до 4 знаков.
+    """
+    rows = np.asarray(rows, dtype=np.intp)
+    cols = np.asarray(cols, dtype=np.intp)
+    result = {}
+    for name, values in metrics.items():
+        values = values[rows] if values.ndim == 1 else values[np.ix_(rows, cols)]
+        values = np.round(values, 4)
+        result[name] = np.where(np.isnan(values), None, values).tolist()
+    return result
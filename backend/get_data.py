@@ -5,6 +5,7 @@ from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from typing import List, Optional
 from constants import USER, PASSWORD, HOST, PORT, DB
+from blob_storage import get_blobs
 
 # Параметры подключения к базе данных
 DATABASE_URL = f"postgresql://{USER}:{PASSWORD}@{HOST}:{PORT}/{DB}"
@@ -25,8 +26,10 @@ class UserData(Base):
     p_dicIds = Column(String, nullable=False)   # Храним как строку
     idx = Column(Integer, nullable=False)
     chart_type = Column(String, nullable=False)
-    selected_data = Column(String, nullable=False)
-    primary_data = Column(String, nullable=False)
+    selected_data = Column(String, nullable=True)     # Устаревшее поле, данные хранятся в user_blobs
+    primary_data = Column(String, nullable=True)      # Устаревшее поле, данные хранятся в user_blobs
+    selected_data_ref = Column(String(64), nullable=True)  # hash из user_blobs
+    primary_data_ref = Column(String(64), nullable=True)   # hash из user_blobs
     folder_id = Column(Integer, nullable=True)   # folder_id может быть null
 
 # Создаем таблицы, если они ещё не существуют
@@ -69,9 +72,28 @@ def get_data(request: Request, folder_id: Optional[int] = None):
         if folder_id is not None:
             query = query.filter(UserData.folder_id == folder_id)
         records = query.all()
+        # Подтягиваем payload-ы графиков из user_blobs одним запросом
+        blobs = get_blobs(db, [r.selected_data_ref for r in records] + [r.primary_data_ref for r in records])
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка получения данных: {e}")
     finally:
         db.close()
     
-    return records
+    return [
+        UserDataOut(
+            id=r.id,
+            user_id=r.user_id,
+            p_index_id=r.p_index_id,
+            p_period_id=r.p_period_id,
+            p_terms=r.p_terms,
+            p_term_id=r.p_term_id,
+            p_dicIds=r.p_dicIds,
+            idx=r.idx,
+            chart_type=r.chart_type,
+            # Для строк, еще не перенесенных миграцией, берем старые поля
+            selected_data=blobs.get(r.selected_data_ref, r.selected_data or ""),
+            primary_data=blobs.get(r.primary_data_ref, r.primary_data or ""),
+            folder_id=r.folder_id
+        )
+        for r in records
+    ]
@@ -0,0 +1,83 @@
+from fastapi import APIRouter, Query, HTTPException
+from fastapi.responses import JSONResponse
+from typing import Optional
+from cache import fetch_cached
+from get_segments import load_segment_dictionary
+import asyncio
+
+router = APIRouter()
+
+async def partial(coro):
+    """
+    Результат одного запроса к taldau: ошибка не прерывает остальные запросы.
+    """
+    try:
+        return {"data": await coro, "error": None}
+    except HTTPException as exc:
+        return {"data": None, "error": exc.detail}
+    except Exception as exc:
+        return {"data": None, "error": f"Ошибка обработки ответа: {exc}"}
+
+async def fetch_periods(indexId):
+    """
+    Список периодов показателя. Ответ неожиданного формата -> 502, чтобы partial записал ошибку.
+    """
+    periods = await fetch_cached("GetPeriodList", {"indexId": indexId})
+    if not isinstance(periods, list) or not all(isinstance(period, dict) and "id" in period for period in periods):
+        raise HTTPException(status_code=502, detail="Некорректный формат списка периодов")
+    return periods
+
+async def fetch_segments(indexId, periodId):
+    dictionary = await load_segment_dictionary(indexId, periodId)
+    return dictionary.segments
+
+async def fetch_attributes(indexId, periodId):
+    return await fetch_cached("GetIndexAttributes", {
+        "periodId": periodId,
+        "measureID": "1",
+        "measureKFC": "1",
+        "indexId": indexId
+    })
+
+async def fetch_period_details(indexId, periodId):
+    segments, attributes = await asyncio.gather(
+        partial(fetch_segments(indexId, periodId)),
+        partial(fetch_attributes(indexId, periodId))
+    )
+    return {"periodId": periodId, "segments": segments, "attributes": attributes}
+
+@router.get(
+    "/get_indicator_bootstrap",
+    tags=["Battle"],
+    summary="Периоды, разрезности и атрибуты показателя одним запросом",
+    description="Периоды, разрезности и атрибуты показателя одним запросом"
+    )
+async def get_indicator_bootstrap(
+    indexId: int = Query(..., alias="indexId", description="Идентификатор показателя"),
+    periodId: Optional[int] = Query(None, alias="periodId", description="Период по умолчанию. Если не указан — данные по всем периодам")
+):
+    """
+    Объединяет GetPeriodList, GetSegmentList и GetIndexAttributes.
+    Запросы выполняются параллельно через кэш; если часть из них завершилась ошибкой,
+    в соответствующем поле возвращается error, остальные данные отдаются как есть.
+    """
+    if periodId is not None:
+        periods, details = await asyncio.gather(
+            partial(fetch_periods(indexId)),
+            fetch_period_details(indexId, periodId)
+        )
+        details = [details]
+    else:
+        periods = await partial(fetch_periods(indexId))
+        period_ids = [period["id"] for period in periods["data"] or []]
+        details = await asyncio.gather(*(fetch_period_details(indexId, period_id) for period_id in period_ids))
+
+    result = {"indexId": indexId, "periods": periods, "details": list(details)}
+
+    failed = periods["error"] is not None and all(
+        item["segments"]["error"] is not None and item["attributes"]["error"] is not None
+        for item in details
+    )
+    if failed:
+        return JSONResponse(status_code=502, content=result)
+    return result
@@ -1,11 +1,16 @@
-from fastapi import APIRouter, HTTPException
-from sqlalchemy import select, Table, Column, Integer, String, MetaData
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from sqlalchemy import select, text, Table, Column, Integer, String, MetaData
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from constants import USER, PASSWORD, HOST, DB
+from typing import Optional
+from cache import TTLCache
+from constants import USER, PASSWORD, HOST, DB, SEARCH_DEFAULT_LIMIT, SEARCH_MAX_LIMIT
+import hashlib
+import json
+import logging
 
 DATABASE_URL = f"postgresql+asyncpg://{USER}:{PASSWORD}@{HOST}/{DB}"  # Замените на свои данные
-engine = create_async_engine(DATABASE_URL, future=True, echo=True)
+engine = create_async_engine(DATABASE_URL, future=True, echo=False)
 async_session = sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
 
 # Определение таблицы indicators
@@ -17,19 +22,122 @@ indicators_table = Table(
     Column("name", String, nullable=False)
 )
 
+# Нормализованное название: нижний регистр и "ё" -> "е".
+# Выражение должно совпадать с индексом ix_indicators_name_trgm, иначе индекс не используется
+NORMALIZED_NAME = "replace(lower(name), 'ё', 'е')"
+
+# Кэш полного списка показателей и результатов поиска
+indicators_cache = TTLCache()
+
 router = APIRouter()
 
+@router.on_event("startup")
+async def create_search_index():
+    """
+    Создает триграммный индекс по названию показателя для /search_indicators.
+    """
+    try:
+        async with engine.begin() as conn:
+            await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            await conn.execute(text(
+                f"CREATE INDEX IF NOT EXISTS ix_indicators_name_trgm "
+                f"ON indicators USING gin (({NORMALIZED_NAME}) gin_trgm_ops)"
+            ))
+    except Exception as e:
+        # Без индекса поиск работает, но медленнее
+        logging.warning("Не удалось создать индекс для поиска показателей: %s", e)
+
+def normalize_query(q: str) -> str:
+    return " ".join(q.lower().replace("ё", "е").split())
+
+def escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+async def load_indicators():
+    """
+    Возвращает (список показателей, ETag). Непустой результат кэшируется: пустая таблица
+    (например, еще не заполненная после развертывания) проверяется при каждом запросе.
+    """
+    cached = indicators_cache.get("all")
+    if cached is not None:
+        return cached
+    async with async_session() as session:
+        async with session.begin():
+            result = await session.execute(select(indicators_table).order_by(indicators_table.c.id))
+            indicators = [{"id": row.id, "name": row.name} for row in result.fetchall()]
+    etag = '"' + hashlib.sha1(json.dumps(indicators, ensure_ascii=False).encode("utf-8")).hexdigest() + '"'
+    if indicators:
+        indicators_cache.set("all", (indicators, etag))
+    return indicators, etag
+
 @router.get(
     "/get_indicators",
     tags=["Battle"],
     summary="Показатели в локальной БД",
     description="Показатели в локальной БД"
     )
-async def get_indicators():
+async def get_indicators(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, description="Количество записей (по умолчанию все)"),
+    offset: int = Query(0, ge=0, description="Смещение от начала списка")
+):
+    indicators, etag = await load_indicators()
+    if not indicators:
+        raise HTTPException(status_code=404, detail="No indicators found")
+
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "X-Total-Count": str(len(indicators))}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+    end = offset + limit if limit is not None else None
+    return indicators[offset:end]
+
+@router.get(
+    "/search_indicators",
+    tags=["Battle"],
+    summary="Поиск показателей по названию",
+    description="Поиск показателей по названию"
+    )
+async def search_indicators(
+    q: str = Query(..., min_length=1, description="Строка поиска"),
+    limit: int = Query(SEARCH_DEFAULT_LIMIT, ge=1, le=SEARCH_MAX_LIMIT, description="Максимальное количество результатов")
+):
+    """
+    Сначала названия, начинающиеся с запроса, затем содержащие слово с таким началом,
+    затем остальные совпадения по подстроке и по триграммному сходству.
+    """
+    query = normalize_query(q)
+    if not query:
+        return []
+
+    key = ("search", query, limit)
+    cached = indicators_cache.get(key)
+    if cached is not None:
+        return cached
+
+    pattern = escape_like(query)
+    statement = text(
+        f"SELECT id, name FROM indicators "
+        f"WHERE {NORMALIZED_NAME} LIKE :contains OR {NORMALIZED_NAME} % :query "
+        f"ORDER BY {NORMALIZED_NAME} LIKE :prefix DESC, "
+        f"{NORMALIZED_NAME} LIKE :word_prefix DESC, "
+        f"similarity({NORMALIZED_NAME}, :query) DESC, "
+        f"length(name), id "
+        f"LIMIT :limit"
+    )
     async with async_session() as session:
-        async with session.begin():
-            result = await session.execute(select(indicators_table))
-            indicators = result.fetchall()
-            if not indicators:
-                raise HTTPException(status_code=404, detail="No indicators found")
-            return [{"id": row.id, "name": row.name} for row in indicators]
\ No newline at end of file
+        result = await session.execute(statement, {
+            "query": query,
+            "contains": f"%{pattern}%",
+            "prefix": f"{pattern}%",
+            "word_prefix": f"% {pattern}%",
+            "limit": limit,
+        })
+        indicators = [{"id": row.id, "name": row.name} for row in result.fetchall()]
+
+    # Пустой результат не кэшируем: показатели могут появиться до истечения TTL
+    if indicators:
+        indicators_cache.set(key, indicators)
+    return indicators
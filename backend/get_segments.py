@@ -1,8 +1,6 @@
 from fastapi import APIRouter, Query
-from constants import BASE_URL, RETRIES
-from fastapi.responses import JSONResponse
-import time
-import httpx
+from cache import TTLCache, fetch_upstream, get_or_create, make_key
+from constants import SEGMENT_DICTIONARY_TTL
 
 router = APIRouter()
 
@@ -19,6 +17,32 @@ def transform_data(data):
 
     return data
 
+class SegmentDictionary:
+    """
+    Разобранный ответ GetSegmentList для пары (indexId, periodId):
+    segments — ответ /get_segments (после transform_data),
+    terms — {id элемента: название}.
+    """
+    __slots__ = ("segments", "terms")
+
+    def __init__(self, data):
+        self.segments = transform_data(data)
+        self.terms = {}
+        for item in self.segments:
+            for term in item["mas_names"]:
+                self.terms.setdefault(term["id"], term["name"])
+
+# Справочники строятся один раз на (indexId, periodId)
+segment_dictionaries = TTLCache(ttl=SEGMENT_DICTIONARY_TTL)
+
+async def load_segment_dictionary(indexId, periodId):
+    params = {"indexId": indexId, "periodId": periodId}
+
+    async def build():
+        return SegmentDictionary(await fetch_upstream("GetSegmentList", params))
+
+    return await get_or_create(segment_dictionaries, make_key("SegmentDictionary", params), build)
+
 @router.get(
     "/get_segments",
     tags=["Battle"],
@@ -29,32 +53,5 @@ async def get_segments(
     indexId: int = Query(..., alias="indexId", description="Идентификатор показателя"),
     periodId: int = Query(..., alias="periodId", description="Идентификатор типа периода (из запроса GetPeriodList)")
 ):
-    url = f"{BASE_URL}/GetSegmentList"
-    params = {
-        "indexId": indexId,
-        "periodId": periodId,
-    }
-    for attempt in range(RETRIES):
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(url, params=params)
-                response.raise_for_status()
-                return transform_data(response.json())
-                
-        except httpx.HTTPStatusError as exc:
-            if attempt < RETRIES - 1:
-                time.sleep(2)
-                continue
-            return JSONResponse(
-                status_code=exc.response.status_code,
-                content={"detail": f"Ошибка запроса: {exc.response.text}"}
-            )
-        except httpx.RequestError as exc:
-            if attempt < RETRIES - 1:
-                time.sleep(2)
-                continue
-            return JSONResponse(
-                status_code=500,
-                content={"detail": f"Ошибка соединения: {exc}"}
-            )
-    return True
\ No newline at end of file
+    dictionary = await load_segment_dictionary(indexId, periodId)
+    return dictionary.segments
@@ -0,0 +1,39 @@
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
+from typing import List
+from get_segments import load_segment_dictionary
+
+router = APIRouter()
+
+# Не больше элементов за один запрос
+MAX_TERM_IDS = 5000
+
+class TermLookup(BaseModel):
+    indexId: int
+    periodId: int
+    termIds: List[str]
+
+@router.post(
+    "/lookup_terms",
+    tags=["Battle"],
+    summary="Названия элементов справочников по их идентификаторам",
+    description="Названия элементов справочников по их идентификаторам"
+    )
+async def lookup_terms(data: TermLookup):
+    """
+    Возвращает {id элемента: название} по справочнику GetSegmentList для (indexId, periodId).
+    Идентификаторы, которых нет в справочнике, перечисляются в missing.
+    """
+    if len(data.termIds) > MAX_TERM_IDS:
+        raise HTTPException(status_code=400, detail=f"Можно передать не более {MAX_TERM_IDS} идентификаторов")
+
+    dictionary = await load_segment_dictionary(data.indexId, data.periodId)
+    terms = {}
+    missing = []
+    for term_id in dict.fromkeys(term_id.strip() for term_id in data.termIds):
+        name = dictionary.terms.get(term_id)
+        if name is None:
+            missing.append(term_id)
+        else:
+            terms[term_id] = name
+    return {"terms": terms, "missing": missing}
@@ -1,5 +1,7 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from admission import AdmissionControlMiddleware
+from profiling import ProfilingMiddleware, router as profiling_router
 
 from get_indicators import router as get_indicators_router  #
 from get_periods import router as get_periods_router #
@@ -13,9 +15,18 @@ from get_user_folders import router as get_user_folders_router
 from save_folder import router as save_folder_router
 from update_folder import router as update_folder_router
 from delete_folder import router as delete_folder_router
+from compare_indicators import router as compare_indicators_router
+from get_indicator_bootstrap import router as get_indicator_bootstrap_router
+from lookup_terms import router as lookup_terms_router
+from blob_storage import upgrade_user_data_schema
 
 app = FastAPI()
 
+# Схема user_data / user_blobs обновляется один раз при старте, после создания таблиц модулями выше
+@app.on_event("startup")
+def upgrade_schema():
+    upgrade_user_data_schema()
+
 origins = [
     "http://localhost:3000",
     "http://localhost:5174",
@@ -32,6 +43,11 @@ origins = [
     "https://www.reddiamonds.kz",
 ]
 
+app.add_middleware(ProfilingMiddleware)
+
+# Добавляется до CORS, чтобы ответы 503/504 тоже получали CORS-заголовки
+app.add_middleware(AdmissionControlMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
@@ -51,4 +67,8 @@ app.include_router(delete_data_router)
 app.include_router(get_user_folders_router)  
 app.include_router(save_folder_router)
 app.include_router(update_folder_router)  
-app.include_router(delete_folder_router) 
+app.include_router(delete_folder_router)
+app.include_router(compare_indicators_router)
+app.include_router(get_indicator_bootstrap_router)
+app.include_router(profiling_router)
+app.include_router(lookup_terms_router)
@@ -0,0 +1,114 @@
+"""
+Перенос selected_data / primary_data из user_data в user_blobs.
+
+Запуск внутри контейнера backend:
+    python migrate_user_blobs.py              # перенос + замеры до/после
+    python migrate_user_blobs.py --vacuum     # дополнительно VACUUM FULL user_data
+    python migrate_user_blobs.py --gc         # только удаление неиспользуемых blob-ов
+
+Скрипт можно запускать повторно: уже перенесенные строки пропускаются.
+"""
+import argparse
+import time
+
+from sqlalchemy import text
+from blob_storage import engine, SessionLocal, put_blob, get_blobs, delete_unused_blobs, upgrade_user_data_schema
+
+BATCH_SIZE = 500
+QUERY_RUNS = 20
+
+def measure(label):
+    """
+    Печатает размер user_data / user_blobs и среднее время чтения, которое выполняет /get-data:
+    строки пользователя и payload-ы из user_blobs с распаковкой.
+    """
+    db = SessionLocal()
+    try:
+        user_data_size = db.execute(text("SELECT pg_total_relation_size('user_data')")).scalar()
+        blobs_size = db.execute(text("SELECT pg_total_relation_size('user_blobs')")).scalar()
+        user_ids = [row[0] for row in db.execute(text("SELECT DISTINCT user_id FROM user_data LIMIT 50"))]
+
+        elapsed = 0.0
+        for _ in range(QUERY_RUNS):
+            for user_id in user_ids:
+                started = time.perf_counter()
+                rows = db.execute(text("SELECT * FROM user_data WHERE user_id = :user_id"), {"user_id": user_id}).fetchall()
+                get_blobs(db, [row.selected_data_ref for row in rows] + [row.primary_data_ref for row in rows])
+                elapsed += time.perf_counter() - started
+        queries = QUERY_RUNS * len(user_ids)
+    finally:
+        db.close()
+
+    print(f"[{label}] user_data: {user_data_size / 1024:.1f} KiB, user_blobs: {blobs_size / 1024:.1f} KiB")
+    if queries:
+        print(f"[{label}] /get-data query: {elapsed / queries * 1000:.2f} ms avg ({queries} runs)")
+
+def migrate():
+    """
+    Переносит payload-ы пачками по BATCH_SIZE строк, очищая старые колонки.
+    """
+    moved = 0
+    db = SessionLocal()
+    try:
+        while True:
+            rows = db.execute(text(
+                "SELECT id, selected_data, primary_data FROM user_data "
+                "WHERE selected_data_ref IS NULL "
+                "ORDER BY id LIMIT :limit"
+            ), {"limit": BATCH_SIZE}).fetchall()
+            if not rows:
+                break
+            for row in rows:
+                db.execute(text(
+                    "UPDATE user_data SET selected_data_ref = :selected_ref, primary_data_ref = :primary_ref, "
+                    "selected_data = NULL, primary_data = NULL WHERE id = :id"
+                ), {
+                    "id": row.id,
+                    "selected_ref": put_blob(db, row.selected_data or ""),
+                    "primary_ref": put_blob(db, row.primary_data or ""),
+                })
+            db.commit()
+            moved += len(rows)
+            print(f"Перенесено строк: {moved}")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    return moved
+
+def collect_garbage():
+    """
+    Удаляет blob-ы, на которые больше не ссылается ни одна строка user_data
+    (кроме сохраненных за последние BLOB_GC_GRACE_PERIOD секунд).
+    """
+    db = SessionLocal()
+    try:
+        deleted = delete_unused_blobs(db)
+        db.commit()
+    finally:
+        db.close()
+    print(f"Удалено неиспользуемых blob-ов: {deleted}")
+
+def vacuum():
+    # VACUUM нельзя выполнять внутри транзакции
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("VACUUM FULL ANALYZE user_data"))
+        conn.execute(text("VACUUM ANALYZE user_blobs"))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vacuum", action="store_true", help="выполнить VACUUM FULL после переноса")
+    parser.add_argument("--gc", action="store_true", help="только удалить неиспользуемые blob-ы")
+    args = parser.parse_args()
+
+    upgrade_user_data_schema()
+    if args.gc:
+        collect_garbage()
+    else:
+        measure("до")
+        migrate()
+        collect_garbage()
+        if args.vacuum:
+            vacuum()
+        measure("после")
@@ -1,100 +1,89 @@
-from fastapi import APIRouter, Query, HTTPException
-from constants import BASE_URL, RETRIES
-import time
-import httpx
+from fastapi import APIRouter, Query, HTTPException, Response
+from typing import Optional
+from cache import TTLCache, fetch_cached, fetch_upstream, get_or_create, make_key
+from tree_frame import TreeFrame
+from derived_metrics import parse_metrics, compute_metrics, select_metrics
+import asyncio
 
 router = APIRouter()
 
+# Кэш данных дерева в компактном виде (TreeFrame)
+tree_cache = TTLCache()
+
 async def fetch_data(params):
     """
-    Выполняет запрос к API с передачей параметров и обработкой ошибок.
+    Данные дерева показателя GetIndexTreeData. В кэш попадает уже TreeFrame, см. load_frame.
     """
-    url = f"{BASE_URL}/GetIndexTreeData"
-
-    for attempt in range(RETRIES):
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(url, params=params)
-                response.raise_for_status()
-                return response.json()
-        except httpx.HTTPStatusError as exc:
-            if attempt < RETRIES - 1:
-                time.sleep(2)
-                continue
-            raise HTTPException(
-                status_code=exc.response.status_code,
-                detail=f"Ошибка запроса: {exc.response.text}"
-            )
-        except httpx.RequestError as exc:
-            if attempt < RETRIES - 1:
-                time.sleep(2)
-                continue
-            raise HTTPException(
-                status_code=500,
-                detail=f"Ошибка соединения: {exc}"
-            )
-    raise HTTPException(
-        status_code=500,
-        detail="Превышено количество попыток запроса"
-    )
+    return await fetch_upstream("GetIndexTreeData", params)
 
 async def build_data(params):
     """
-    Выполняет запрос к API с передачей параметров и обработкой ошибок.
+    Список периодов показателя GetIndexPeriods (через кэш).
     """
-    url = f"{BASE_URL}/GetIndexPeriods"
-
-    for attempt in range(RETRIES):
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(url, params=params)
-                response.raise_for_status()
-                return response.json()
-        except httpx.HTTPStatusError as exc:
-            if attempt < RETRIES - 1:
-                time.sleep(2)
-                continue
-            raise HTTPException(
-                status_code=exc.response.status_code,
-                detail=f"Ошибка запроса: {exc.response.text}"
-            )
-        except httpx.RequestError as exc:
-            if attempt < RETRIES - 1:
-                time.sleep(2)
-                continue
-            raise HTTPException(
-                status_code=500,
-                detail=f"Ошибка соединения: {exc}"
-            )
-    raise HTTPException(
-        status_code=500,
-        detail="Превышено количество попыток запроса"
-    )
+    return await fetch_cached("GetIndexPeriods", params)
+
+async def load_frame(params):
+    """
+    Возвращает TreeFrame для параметров new_get_index_tree_data.
+    Дерево и периоды загружаются параллельно, результат кэшируется.
+    """
+    data_params = {
+        key: params[key]
+        for key in ("p_measure_id", "p_index_id", "p_period_id", "p_terms", "p_term_id", "p_dicIds")
+    }
+
+    async def build():
+        tree, date = await asyncio.gather(fetch_data(params), build_data(data_params))
+        return TreeFrame.from_upstream(tree, date)
 
-def transform_data(regions_data, date_data):
-    transformed_data = []
-
-    # Идем по регионам и их детям
-    for region in regions_data:
-        region_dict = {
-            "id": region["id"],
-            "text": region["text"],
-            "leaf": region["leaf"]
-        }
-        
-        # Добавляем данные по датам из dateList
-        for i, date in enumerate(date_data["dateList"]):
-            # Строим ключ, например "y122000"
-            region_key = f"y{date}"
-            
-            # Получаем значение из исходных данных региона по ключу y122XXX
-            year_value = region.get(region_key)
-            if year_value:
-                region_dict[date_data["periodNameList"][i]] = year_value
-
-        transformed_data.append(region_dict)
-
-    return transformed_data
+    return await get_or_create(tree_cache, make_key("TreeFrame", params), build)
+
+def split_list(value):
+    """
+    "a, b,c" -> ["a", "b", "c"]; пустая строка или None -> None.
+    """
+    if not value:
+        return None
+    items = [item.strip() for item in value.split(",") if item.strip()]
+    return items or None
+
+def select_periods(frame, periods=None, period_from=None, period_to=None):
+    """
+    Возвращает индексы выбранных периодов frame.
+    period_from / period_to — названия периодов, границы включаются.
+    """
+    names = frame.periods
+    for bound in (period_from, period_to):
+        if bound is not None and bound not in names:
+            raise HTTPException(status_code=400, detail=f"Период {bound} не найден")
+    start = names.index(period_from) if period_from is not None else 0
+    end = names.index(period_to) + 1 if period_to is not None else len(names)
+    cols = range(start, end)
+
+    if periods is not None:
+        wanted = set(periods)
+        cols = [col for col in cols if names[col] in wanted]
+    return cols
+
+def filter_indices(frame, periods=None, period_from=None, period_to=None,
+                   node_ids=None, leaf=None, limit=None):
+    """
+    Возвращает индексы (строк, столбцов) frame, прошедших фильтры.
+    """
+    cols = select_periods(frame, periods, period_from, period_to)
+    wanted_ids = set(node_ids) if node_ids is not None else None
+
+    rows = []
+    for row, node in enumerate(frame.nodes):
+        if limit is not None and len(rows) >= limit:
+            break
+        if wanted_ids is not None and str(node.id) not in wanted_ids:
+            continue
+        if leaf is not None and bool(node.leaf) != leaf:
+            continue
+        rows.append(row)
+
+    return rows, cols
 
 @router.get(
     "/new_get_index_tree_data",
@@ -110,7 +99,16 @@ async def new_get_index_tree_data(
     p_term_id: int = Query(..., description="Главный элемент, по которому нужна детализация (один из p_terms)"),
     p_dicIds: str = Query(..., description="Список справочников, разделённых запятыми (dicId из GetSegmentList)"),
     idx: int = Query(..., description="Индекс разрезности (idx из GetSegmentList)"),
-    p_parent_id: str = Query('', description="Идентификатор родительского элемента. Для корня оставить пустым.")
+    p_parent_id: str = Query('', description="Идентификатор родительского элемента. Для корня оставить пустым."),
+    periods: Optional[str] = Query(None, description="Названия периодов через запятую (из periodNameList)"),
+    period_from: Optional[str] = Query(None, description="Первый период диапазона (включительно)"),
+    period_to: Optional[str] = Query(None, description="Последний период диапазона (включительно)"),
+    node_ids: Optional[str] = Query(None, description="Идентификаторы узлов через запятую"),
+    leaf: Optional[bool] = Query(None, description="Только листовые (true) или только нелистовые (false) узлы"),
+    limit: Optional[int] = Query(None, ge=1, description="Максимальное количество строк"),
+    format: str = Query("records", description="Формат ответа: records (список строк) или columnar (матрица)"),
+    metrics: Optional[str] = Query(None, description="Производные метрики через запятую: yoy, share, cagr, rank"),
+    share_of: Optional[str] = Query(None, description="Узел, относительно которого считается share (по умолчанию сумма по всем узлам уровня)")
 ):
     """
     Получает данные показателя GetIndexTreeData с помощью API.
@@ -126,15 +124,26 @@ async def new_get_index_tree_data(
         "p_parent_id": p_parent_id,
     }
 
-    data_params = {
-        "p_measure_id": p_measure_id,
-        "p_index_id": p_index_id,
-        "p_period_id": p_period_id,
-        "p_terms": p_terms,
-        "p_term_id": p_term_id,
-        "p_dicIds": p_dicIds,
-    }
+    if format not in ("records", "columnar"):
+        raise HTTPException(status_code=400, detail="format должен быть records или columnar")
+
+    metric_names = parse_metrics(metrics)
+
+    frame = await load_frame(params)
+    rows, cols = filter_indices(
+        frame,
+        periods=split_list(periods),
+        period_from=period_from,
+        period_to=period_to,
+        node_ids=split_list(node_ids),
+        leaf=leaf,
+        limit=limit
+    )
+
+    # Метрики считаются по всему кэшированному TreeFrame и только потом фильтруются:
+    # yoy опирается на тот же период предыдущего года, share и rank — на все узлы
+    derived = None
+    if metric_names:
+        derived = select_metrics(compute_metrics(frame, metric_names, share_of), rows, cols)
 
-    tree = await fetch_data(params)
-    date = await build_data(data_params)
-    return transform_data(tree, date)
\ No newline at end of file
+    return Response(content=frame.select(rows, cols).to_json(format, derived), media_type="application/json")
\ No newline at end of file
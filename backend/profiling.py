@@ -0,0 +1,257 @@
+import asyncio
+import cProfile
+import hmac
+import io
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+from starlette.requests import Request
+from constants import (
+    PROFILING_TOKEN,
+    PROFILE_DIR,
+    SLOW_REQUEST_THRESHOLD,
+    PROFILE_MAX_FILES,
+    PROFILE_SAMPLE_INTERVAL,
+    LOOP_LAG_THRESHOLD,
+)
+
+router = APIRouter()
+
+# Идентификатор потока, в котором работает event loop (заполняется при старте)
+loop_thread_id = None
+
+def loop_stack():
+    """
+    Текущий стек потока event loop в виде списка "файл:функция:строка".
+    """
+    frame = sys._current_frames().get(loop_thread_id)
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+class StackSampler(threading.Thread):
+    """
+    Фоновый поток, который, пока выполняются запросы, с интервалом PROFILE_SAMPLE_INTERVAL
+    снимает стек event loop и добавляет его в Counter каждого активного запроса.
+    Запросы выполняются в одном потоке, поэтому снимок относится ко всем активным запросам сразу.
+    """
+    def __init__(self, interval=PROFILE_SAMPLE_INTERVAL):
+        super().__init__(name="stack-sampler", daemon=True)
+        self.interval = interval
+        self.targets = {}
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+
+    def track(self, samples):
+        with self.lock:
+            self.targets[id(samples)] = samples
+        self.wakeup.set()
+
+    def untrack(self, samples):
+        with self.lock:
+            self.targets.pop(id(samples), None)
+
+    def run(self):
+        while True:
+            self.wakeup.wait()
+            stack = ";".join(loop_stack())
+            with self.lock:
+                if not self.targets:
+                    # Нет активных запросов — ждем следующего
+                    self.wakeup.clear()
+                    continue
+                if stack:
+                    for samples in self.targets.values():
+                        samples[stack] += 1
+            time.sleep(self.interval)
+
+class LoopLagMonitor:
+    """
+    Измеряет задержку event loop: корутина раз в interval обновляет heartbeat,
+    а сторожевой поток, заметив, что heartbeat давно не обновлялся, сохраняет стек
+    event loop — это показывает блокирующий вызов (например, time.sleep).
+    """
+    def __init__(self, threshold=LOOP_LAG_THRESHOLD, interval=0.05):
+        self.threshold = threshold
+        self.interval = interval
+        self.heartbeat = time.monotonic()
+        self.max_lag = 0.0
+        self.last_lag = 0.0
+        self.blocked_count = 0
+        self.recent_blocks = []
+
+    async def beat(self):
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self.heartbeat = now
+            self.last_lag = now - started - self.interval
+            self.max_lag = max(self.max_lag, self.last_lag)
+
+    def watch(self):
+        reported = None
+        while True:
+            time.sleep(self.interval)
+            heartbeat = self.heartbeat
+            if time.monotonic() - heartbeat < self.threshold + self.interval or reported == heartbeat:
+                continue
+            # Один отчет на каждый эпизод блокировки
+            reported = heartbeat
+            stack = loop_stack()
+            self.blocked_count += 1
+            self.recent_blocks = (self.recent_blocks + [{"at": time.time(), "stack": stack}])[-20:]
+            logging.warning("Event loop заблокирован дольше %s с:\n  %s", self.threshold, "\n  ".join(stack[-10:]))
+
+sampler = StackSampler()
+lag_monitor = LoopLagMonitor()
+profile_lock = asyncio.Lock()
+
+@router.on_event("startup")
+async def start_monitoring():
+    global loop_thread_id
+    # Без PROFILING_TOKEN профилирование и мониторинг event loop выключены
+    if loop_thread_id is not None or not PROFILING_TOKEN:
+        return
+    loop_thread_id = threading.get_ident()
+    asyncio.ensure_future(lag_monitor.beat())
+    threading.Thread(target=lag_monitor.watch, name="loop-lag-monitor", daemon=True).start()
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    sampler.start()
+
+def is_admin(token):
+    # Сравнение за постоянное время, чтобы токен нельзя было подобрать по времени ответа
+    return bool(PROFILING_TOKEN) and token is not None and hmac.compare_digest(token.encode(), PROFILING_TOKEN.encode())
+
+class ProfilingMiddleware:
+    """
+    - ?profile=1 или заголовок X-Profile: 1 (вместе с X-Profiling-Token) — вместо ответа
+      возвращается отчет cProfile по этому запросу;
+    - запросы дольше SLOW_REQUEST_THRESHOLD сохраняются в PROFILE_DIR в формате
+      collapsed stacks (flamegraph.pl / speedscope).
+    Работает только если задан PROFILING_TOKEN.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not PROFILING_TOKEN:
+            await self.app(scope, receive, send)
+            return
+
+        request = Request(scope)
+        if request.query_params.get("profile") == "1" or request.headers.get("x-profile") == "1":
+            if not is_admin(request.headers.get("x-profiling-token")):
+                await PlainTextResponse("Профилирование недоступно", status_code=403)(scope, receive, send)
+                return
+            await self.profile(scope, receive, send)
+            return
+
+        samples = Counter()
+        started = time.monotonic()
+        sampler.track(samples)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            sampler.untrack(samples)
+            elapsed = time.monotonic() - started
+            if elapsed >= SLOW_REQUEST_THRESHOLD and samples:
+                save_samples(scope, elapsed, samples)
+
+    async def profile(self, scope, receive, send):
+        if profile_lock.locked():
+            await PlainTextResponse("Уже выполняется профилирование другого запроса", status_code=409)(scope, receive, send)
+            return
+
+        status = None
+
+        async def capture(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+
+        async with profile_lock:
+            profiler = cProfile.Profile()
+            started = time.monotonic()
+            profiler.enable()
+            try:
+                await self.app(scope, receive, capture)
+            finally:
+                profiler.disable()
+            elapsed = time.monotonic() - started
+
+        report = io.StringIO()
+        report.write(f"{scope['method']} {scope['path']} -> {status}, {elapsed * 1000:.1f} ms\n")
+        report.write("Профилируется весь event loop, включая параллельные запросы.\n\n")
+        pstats.Stats(profiler, stream=report).sort_stats("cumulative").print_stats(60)
+        await PlainTextResponse(report.getvalue())(scope, receive, send)
+
+def save_samples(scope, elapsed, samples):
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{int(elapsed * 1000)}ms{scope['path'].replace('/', '_')}.txt"
+    try:
+        with open(os.path.join(PROFILE_DIR, name), "w") as file:
+            file.write(f"# {scope['method']} {scope['path']}?{scope.get('query_string', b'').decode()} {elapsed:.3f}s\n")
+            for stack, count in samples.most_common():
+                file.write(f"{stack} {count}\n")
+        prune_profiles()
+    except OSError as e:
+        logging.warning("Не удалось сохранить профиль медленного запроса: %s", e)
+
+def prune_profiles(keep=PROFILE_MAX_FILES):
+    """
+    Оставляет в PROFILE_DIR только keep самых новых профилей.
+    Имена файлов начинаются с даты и времени, поэтому сортировка по имени — хронологическая.
+    """
+    profiles = sorted(name for name in os.listdir(PROFILE_DIR) if name.endswith(".txt"))
+    for name in profiles[:-keep] if keep else profiles:
+        try:
+            os.remove(os.path.join(PROFILE_DIR, name))
+        except FileNotFoundError:
+            pass
+
+@router.get(
+    "/admin/profiling",
+    tags=["Admin"],
+    summary="Состояние event loop и сохраненные профили медленных запросов",
+    description="Состояние event loop и сохраненные профили медленных запросов"
+)
+async def profiling_status(x_profiling_token: str = Header(None)):
+    if not is_admin(x_profiling_token):
+        raise HTTPException(status_code=403, detail="Профилирование недоступно")
+    profiles = sorted(os.listdir(PROFILE_DIR), reverse=True) if os.path.isdir(PROFILE_DIR) else []
+    return {
+        "loop_lag": {
+            "last": lag_monitor.last_lag,
+            "max": lag_monitor.max_lag,
+            "blocked_count": lag_monitor.blocked_count,
+            "recent_blocks": lag_monitor.recent_blocks,
+        },
+        "slow_request_threshold": SLOW_REQUEST_THRESHOLD,
+        "profiles": profiles[:100],
+    }
+
+@router.get(
+    "/admin/profiling/{name}",
+    tags=["Admin"],
+    summary="Профиль медленного запроса (collapsed stacks)",
+    description="Профиль медленного запроса (collapsed stacks)"
+)
+async def profiling_file(name: str, x_profiling_token: str = Header(None)):
+    if not is_admin(x_profiling_token):
+        raise HTTPException(status_code=403, detail="Профилирование недоступно")
+    path = os.path.join(PROFILE_DIR, os.path.basename(name))
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="Профиль не найден")
+    with open(path) as file:
+        return PlainTextResponse(file.read())
@@ -4,6 +4,7 @@ from sqlalchemy import create_engine, Column, Integer, String
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from constants import USER, PASSWORD, HOST, PORT, DB
+from blob_storage import put_blob
 
 # Конфигурация подключения к PostgreSQL (замените данные подключения на свои)
 DATABASE_URL = f"postgresql://{USER}:{PASSWORD}@{HOST}:{PORT}/{DB}"
@@ -25,8 +26,10 @@ class UserData(Base):
     p_dicIds = Column(String, nullable=False)   
     idx = Column(Integer, nullable=False)
     chart_type = Column(String, nullable=False)
-    selected_data = Column(String, nullable=False)
-    primary_data = Column(String, nullable=False)
+    selected_data = Column(String, nullable=True)     # Устаревшее поле, данные хранятся в user_blobs
+    primary_data = Column(String, nullable=True)      # Устаревшее поле, данные хранятся в user_blobs
+    selected_data_ref = Column(String(64), nullable=True)  # hash из user_blobs
+    primary_data_ref = Column(String(64), nullable=True)   # hash из user_blobs
     folder_id = Column(Integer, nullable=False)
 
 # Создаем таблицы (если они ещё не существуют)
@@ -70,8 +73,8 @@ def save_data(data: UserDataCreate, request: Request):
             p_dicIds=data.p_dicIds,
             idx=data.idx,
             chart_type=data.chart_type,
-            selected_data=data.selected_data,
-            primary_data=data.primary_data,
+            selected_data_ref=put_blob(db, data.selected_data),
+            primary_data_ref=put_blob(db, data.primary_data),
             folder_id=data.folder_id
         )
         db.add(db_data)
@@ -0,0 +1,172 @@
+import json
+import math
+import sys
+from array import array
+
+NAN = float("nan")
+
+def parse_value(value):
+    """
+    Приводит значение ячейки к float. Пустые и нечисловые значения -> None.
+    """
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        number = float(str(value).replace("\xa0", "").replace(" ", "").replace(",", "."))
+    except ValueError:
+        return None
+    return number if math.isfinite(number) else None
+
+class TreeNode:
+    """
+    Узел дерева GetIndexTreeData без значений.
+    """
+    __slots__ = ("id", "text", "leaf")
+
+    def __init__(self, id, text, leaf):
+        self.id = id
+        self.text = sys.intern(text) if isinstance(text, str) else text
+        self.leaf = leaf
+
+class TreeFrame:
+    """
+    Компактное представление данных GetIndexTreeData для кэша.
+
+    Названия периодов хранятся один раз на весь ответ, значения — в array('d')
+    построчно (узел x период), отсутствующие значения — NaN. Непустые значения,
+    которые не удалось привести к числу, хранятся отдельно в raw как есть.
+    """
+    __slots__ = ("periods", "date_ids", "nodes", "values", "raw", "metrics")
+
+    def __init__(self, periods, date_ids, nodes, values, raw=None):
+        self.periods = periods     # tuple названий периодов
+        self.date_ids = date_ids   # tuple идентификаторов дат taldau (dateList)
+        self.nodes = nodes         # tuple TreeNode
+        self.values = values       # array('d'), len(nodes) * len(periods)
+        self.raw = raw or {}       # {(строка, столбец): исходное значение}
+        self.metrics = {}          # Рассчитанные производные метрики, см. derived_metrics
+
+    @classmethod
+    def from_upstream(cls, regions_data, date_data):
+        date_ids = tuple(date_data["dateList"])
+        periods = tuple(sys.intern(str(name)) for name in date_data["periodNameList"])
+        keys = [f"y{date}" for date in date_ids]
+
+        nodes = []
+        values = array("d")
+        raw = {}
+        for row, region in enumerate(regions_data):
+            nodes.append(TreeNode(region["id"], region["text"], region["leaf"]))
+            for col, key in enumerate(keys):
+                value = region.get(key)
+                number = parse_value(value) if value else None
+                if number is None:
+                    values.append(NAN)
+                    if value:
+                        raw[(row, col)] = value
+                else:
+                    values.append(number)
+        return cls(periods, date_ids, tuple(nodes), values, raw)
+
+    def cell(self, row, col):
+        """
+        Значение ячейки: float, исходная строка для нечисловых значений или None.
+        """
+        value = self.values[row * len(self.periods) + col]
+        if value == value:
+            return value
+        return self.raw.get((row, col))
+
+    def select(self, rows=None, cols=None):
+        """
+        Новый TreeFrame только с выбранными строками и столбцами (списки индексов).
+        """
+        width = len(self.periods)
+        rows = range(len(self.nodes)) if rows is None else rows
+        cols = range(width) if cols is None else cols
+        if len(rows) == len(self.nodes) and len(cols) == width:
+            return self
+
+        values = array("d")
+        raw = {}
+        for new_row, row in enumerate(rows):
+            offset = row * width
+            values.extend(self.values[offset + col] for col in cols)
+            if self.raw:
+                for new_col, col in enumerate(cols):
+                    if (row, col) in self.raw:
+                        raw[(new_row, new_col)] = self.raw[(row, col)]
+        return TreeFrame(
+            tuple(self.periods[col] for col in cols),
+            tuple(self.date_ids[col] for col in cols),
+            tuple(self.nodes[row] for row in rows),
+            values,
+            raw
+        )
+
+    def to_json(self, format="records", metrics=None):
+        """
+        Сериализует сразу в JSON (bytes), без промежуточных словарей.
+        metrics — результат derived_metrics.select_metrics для тех же строк и столбцов.
+        """
+        if format == "columnar":
+            return self._columnar_json(metrics).encode("utf-8")
+        return self._records_json(metrics).encode("utf-8")
+
+    def _encode_row(self, row):
+        """
+        JSON-представления ячеек строки; None для пустых ячеек.
+        """
+        width = len(self.periods)
+        offset = row * width
+        cells = [
+            (str(int(value)) if value.is_integer() and -1e15 < value < 1e15 else repr(value)) if value == value else None
+            for value in self.values[offset:offset + width]
+        ]
+        if self.raw:
+            for col in range(width):
+                if (row, col) in self.raw:
+                    cells[col] = json.dumps(self.raw[(row, col)], ensure_ascii=False)
+        return cells
+
+    def _row_metrics(self, metrics, row):
+        result = {}
+        for name, values in metrics.items():
+            value = values[row]
+            result[name] = dict(zip(self.periods, value)) if isinstance(value, list) else value
+        return result
+
+    def _records_json(self, metrics=None):
+        keys = ["," + json.dumps(period, ensure_ascii=False) + ":" for period in self.periods]
+        dumps = json.dumps
+        parts = []
+        for row, node in enumerate(self.nodes):
+            parts.append(
+                '{"id":' + dumps(node.id, ensure_ascii=False)
+                + ',"text":' + dumps(node.text, ensure_ascii=False)
+                + ',"leaf":' + dumps(node.leaf)
+                + "".join(key + cell for key, cell in zip(keys, self._encode_row(row)) if cell is not None)
+                + (',"metrics":' + dumps(self._row_metrics(metrics, row), ensure_ascii=False) if metrics else "")
+                + "}"
+            )
+        return "[" + ",".join(parts) + "]"
+
+    def _columnar_json(self, metrics=None):
+        width = len(self.periods)
+        values = self.values.tolist()
+        rows = [
+            [value if value == value else self.raw.get((row, col)) for col, value in enumerate(values[row * width:(row + 1) * width])]
+            for row in range(len(self.nodes))
+        ]
+        result = {
+            "periods": list(self.periods),
+            "nodes": {
+                "id": [node.id for node in self.nodes],
+                "text": [node.text for node in self.nodes],
+                "leaf": [node.leaf for node in self.nodes],
+            },
+            "values": rows,
+        }
+        if metrics:
+            result["metrics"] = metrics
+        return json.dumps(result, ensure_ascii=False)